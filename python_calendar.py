@@ -5,6 +5,7 @@ Date: 2022-04-10
 """
 
 import datetime
+from collections import deque
 from os import listdir, mkdir, getcwd
 from os.path import join
 from shutil import rmtree
@@ -135,7 +136,7 @@ class Page:
     def add_activity(self):
         """
         Creates and adds a new activity to the page.activities list
-        :return: (nothing)
+        :return: tuple -- the operation record for the history
         """
         print("----Lägg till ny aktivitet----")
         (start_time, end_time) = self.get_start_end_times()
@@ -143,6 +144,7 @@ class Page:
         activity = Activity(start_time, end_time, event)
         self.activities.append(activity)
         self.activities.sort()
+        return "add_activity", self, activity
 
     def choose_activity(self):
         """
@@ -171,52 +173,68 @@ class Page:
     def remove_activity(self):
         """
         Removes an activity, specified by the user, from page.activities
-        :return:
+        :return: tuple -- the operation record for the history. None if no activity was removed.
         """
         print("----Ta bort aktivitet----")
         chosen_activity = self.choose_activity()
+        if chosen_activity is None:
+            return
         self.activities.remove(chosen_activity)
+        return "remove_activity", self, chosen_activity
 
     def execute_activity_option(self, option, chosen_activity):
         """
         Makes changes to the chosen activity, depending on the chosen option
         :param option: int --- 1 to 3, the option chosen
         :param chosen_activity: activity object -- the activity to make changes to
-        :return:
+        :return: tuple -- the operation record for the history
         """
         if option == 1:
             print("----Ändra starttid----")
             activity_end_time = chosen_activity.end_time
             while True:
                 new_start_time = get_time_input("Ange ny starttid för aktiviteten (HHMM): ")
-                # Check if times overlap
-                if self.overlapping_times(new_start_time, activity_end_time):
+                if activity_end_time <= new_start_time:
+                    print("Starttiden kan inte vara efter eller lika med sluttiden för aktiviteten!")
+                    continue
+                # Check if times overlap with the other activities
+                if self.overlapping_times(new_start_time, activity_end_time, chosen_activity):
                     print("Tiden överlappar med en annan aktivitet!")
                     answer = get_yes_no_input("Vill du ändra tiden ändå? (j/n): ")
-                    if answer == "yes":
-                        chosen_activity.change_start_time(new_start_time)
-                        return
+                    if answer != "yes":
+                        continue
+                old_start_time = chosen_activity.start_time
+                chosen_activity.change_start_time(new_start_time)
+                self.activities.sort()
+                return "change_activity", self, chosen_activity, "start_time", old_start_time, new_start_time
         elif option == 2:
             print("----Ändra sluttid----")
             activity_start_time = chosen_activity.start_time
             while True:
                 new_end_time = get_time_input("Ange ny sluttid för aktiviteten (HHMM): ")
-                # Check if times overlap
-                if self.overlapping_times(activity_start_time, new_end_time):
+                if new_end_time <= activity_start_time:
+                    print("Sluttiden kan inte vara innan eller lika med starttiden för aktiviteten!")
+                    continue
+                # Check if times overlap with the other activities
+                if self.overlapping_times(activity_start_time, new_end_time, chosen_activity):
                     print("Tiden överlappar med en annan aktivitet!")
                     answer = get_yes_no_input("Vill du ändra tiden ändå? (j/n): ")
-                    if answer == "yes":
-                        chosen_activity.change_end_time(new_end_time)
-                        return
+                    if answer != "yes":
+                        continue
+                old_end_time = chosen_activity.end_time
+                chosen_activity.change_end_time(new_end_time)
+                return "change_activity", self, chosen_activity, "end_time", old_end_time, new_end_time
         elif option == 3:
             print("----Ändra aktiviteten----")
+            old_event = chosen_activity.event
             event = input("Ange aktivitet: ")
             chosen_activity.change_event(event)
+            return "change_activity", self, chosen_activity, "event", old_event, event
 
     def change_activity(self):
         """
         Used to let the user choose an activity from page.activities and change its start time, end time or event.
-        :return:
+        :return: tuple -- the operation record for the history. None if no activity was changed.
         """
         # User picks which activity to change
         chosen_activity = self.choose_activity()
@@ -231,16 +249,19 @@ class Page:
         display_options(activity_options)
         choice = get_choice_input(activity_options)
         # Execute choice
-        self.execute_activity_option(choice, chosen_activity)
+        return self.execute_activity_option(choice, chosen_activity)
 
-    def overlapping_times(self, start_time, end_time):
+    def overlapping_times(self, start_time, end_time, ignored_activity=None):
         """
         Checks if start and end times overlap with any of the activities
         :param start_time: string -- start time to
         :param end_time: string -- end time
+        :param ignored_activity: activity object -- activity to skip, used when changing the times of an activity
         :return:
         """
         for activity in self.activities:
+            if activity is ignored_activity:
+                continue
             cond1 = activity.start_time <= start_time < activity.end_time
             cond2 = activity.start_time < end_time <= activity.end_time
             cond3 = start_time < activity.start_time and end_time > activity.end_time
@@ -250,6 +271,127 @@ class Page:
         return False
 
 
+class History:
+    """
+    Keeps track of the changes made to a calendar so they can be undone and redone.
+    Each change is stored as a small operation record (a tuple) that refers to the affected page and activity
+    objects, instead of a copy of the whole calendar. The memory used therefore grows with the number of edits,
+    not with the size of the calendar.
+
+    Operation records:
+    ("add_page", page)
+    ("delete_page", page)
+    ("add_activity", page, activity)
+    ("remove_activity", page, activity)
+    ("change_activity", page, activity, attribute, old_value, new_value)
+    ("group", [operations]) -- several operations that are undone and redone together
+
+    Attributes:
+    undo_stack: deque of (number, operation) pairs, the changes that can be undone. Oldest changes are dropped
+    when max_depth is reached.
+    redo_stack: list of (number, operation) pairs, the undone changes that can be redone
+    operation_count: int, used to give every recorded operation a unique number
+    base_number: int, the number of the latest operation that was dropped from undo_stack. 0 if none were dropped.
+    saved_number: int, the number of the latest operation when the calendar was last saved. 0 if no operations.
+    unrecorded_changes: boolean, True if the calendar has been changed outside the history since it was last saved
+    """
+    def __init__(self, max_depth=50):
+        """
+        Called whenever a new history object is created
+        :param max_depth: int -- the maximum number of changes that can be undone
+        """
+        self.undo_stack = deque(maxlen=max_depth)
+        self.redo_stack = []
+        self.operation_count = 0
+        self.base_number = 0
+        self.saved_number = 0
+        self.unrecorded_changes = False
+
+    def push(self, number, operation):
+        """
+        Adds an operation to undo_stack. If the stack is full, the oldest operation is dropped and its number is
+        remembered in base_number, since that change is still applied to the calendar.
+        :param number: int -- the operation number
+        :param operation: tuple -- the operation record
+        :return: (nothing)
+        """
+        if len(self.undo_stack) == self.undo_stack.maxlen:
+            if self.undo_stack:
+                self.base_number = self.undo_stack[0][0]
+            else:
+                # A history depth of 0 keeps no operations, the new operation is dropped right away
+                self.base_number = number
+        self.undo_stack.append((number, operation))
+
+    def record(self, operation):
+        """
+        Adds an operation to the history. Clears the changes that could be redone.
+        :param operation: tuple -- the operation record
+        :return: (nothing)
+        """
+        self.operation_count += 1
+        self.push(self.operation_count, operation)
+        self.redo_stack.clear()
+
+    def undo(self, calendar):
+        """
+        Reverts the latest change made to the calendar
+        :param calendar: calendar object -- the calendar to revert the change in
+        :return: boolean -- True if a change was undone, False if there was nothing to undo
+        """
+        if not self.undo_stack:
+            return False
+        (number, operation) = self.undo_stack.pop()
+        revert_operation(calendar, operation)
+        self.redo_stack.append((number, operation))
+        return True
+
+    def redo(self, calendar):
+        """
+        Applies the latest undone change to the calendar again
+        :param calendar: calendar object -- the calendar to apply the change to
+        :return: boolean -- True if a change was redone, False if there was nothing to redo
+        """
+        if not self.redo_stack:
+            return False
+        (number, operation) = self.redo_stack.pop()
+        apply_operation(calendar, operation)
+        self.push(number, operation)
+        return True
+
+    def current_number(self):
+        """
+        Gets the number of the latest change that has not been undone
+        :return: int -- the operation number. base_number if there is no change left to undo.
+        """
+        if not self.undo_stack:
+            return self.base_number
+        return self.undo_stack[-1][0]
+
+    def mark_saved(self):
+        """
+        Remembers the current state of the history as the saved state. Called when the calendar is saved.
+        :return: (nothing)
+        """
+        self.saved_number = self.current_number()
+        self.unrecorded_changes = False
+
+    def mark_unrecorded_change(self):
+        """
+        Remembers that the calendar has been changed without recording an operation, for example when the first
+        page is created because there was no data. Cleared when the calendar is saved.
+        :return: (nothing)
+        """
+        self.unrecorded_changes = True
+
+    def has_unsaved_changes(self):
+        """
+        Checks if the calendar has been changed since it was last saved
+        :return: A boolean
+        """
+        return self.unrecorded_changes or self.current_number() != self.saved_number
+
+
 class Calendar:
     """
     Attributes:
@@ -258,15 +400,17 @@ class Calendar:
     current_page_index: index used to keep track of current page
     data_folder_path: path to folder for storing data files
     data_file_path: path to/name of file for storing data
+    history: history object, used to undo and redo changes
     """
     def __init__(self, storage_format, pages=None, current_page_index=0,
-                 data_folder_path=join(getcwd(), "pages"), data_file_path="pages.txt"):
+                 data_folder_path=join(getcwd(), "pages"), data_file_path="pages.txt", history_depth=50):
 
         self.storage_format = storage_format
         self.pages = pages
         self.current_page_index = current_page_index
         self.data_folder_path = data_folder_path
         self.data_file_path = data_file_path
+        self.history = History(history_depth)
 
     def load_pages(self):
         """
@@ -282,6 +426,7 @@ class Calendar:
         if not self.pages:
             print("Kunde inte hitta någon tidigare data!")
             self.add_page()
+            self.history.mark_unrecorded_change()
 
     def save_pages(self):
         """
@@ -292,11 +437,12 @@ class Calendar:
             write_pages_to_file(self.pages, self.data_file_path)
         elif self.storage_format == 2:
             write_pages_to_folder(self.pages, self.data_folder_path)
+        self.history.mark_saved()
 
     def add_page(self):
         """
         Lets the user create and add a new page to the calendar.
-        :return: (nothing)
+        :return: tuple -- the operation record for the history
         """
         print("----Lägg till ny sida i kalendern----")
         # Gets page date from user, checks that there are no other pages with same date
@@ -311,19 +457,54 @@ class Calendar:
         page.add_activity()         # Add activity to page
         self.pages.append(page)     # Add page to calendar pages
         self.pages.sort()           # Sort by page date
+        return "add_page", page
 
     def delete_current_page(self):
         """
         Deletes the currently displayed page from calendar page list
-        :return: (nothing)
+        :return: tuple -- the operation record for the history
         """
-        del self.pages[self.current_page_index]     # Delete page at current index
+        page = self.pages.pop(self.current_page_index)     # Delete page at current index
+        operation = ("delete_page", page)
         # If calendar page list is empty, create and add new page
         if not self.pages:
-            self.add_page()
+            operation = ("group", [operation, self.add_page()])
         # If current page index is out of bounds after deleting page, move the index back one element
         if self.current_page_index >= len(self.pages):
             self.current_page_index -= 1
+        return operation
+
+    def show_page(self, page):
+        """
+        Sets the current page index to the given page. If the page is not in the calendar, the index is moved back
+        inside the page list instead.
+        :param page: page object -- the page to show
+        :return: (nothing)
+        """
+        if page in self.pages:
+            self.current_page_index = self.pages.index(page)
+        elif self.current_page_index >= len(self.pages):
+            self.current_page_index = max(len(self.pages) - 1, 0)
+
+    def undo(self):
+        """
+        Undoes the latest change to the calendar
+        :return: (nothing)
+        """
+        if self.history.undo(self):
+            print("Ändringen har ångrats!")
+        else:
+            print("Det finns inget att ångra!")
+
+    def redo(self):
+        """
+        Redoes the latest undone change to the calendar
+        :return: (nothing)
+        """
+        if self.history.redo(self):
+            print("Ändringen har gjorts om!")
+        else:
+            print("Det finns inget att göra om!")
 
     def display_all_pages(self):
         """
@@ -366,28 +547,101 @@ class Calendar:
         :param option: int -- the option to be executed
         :return: (nothing)
         """
+        operation = None
         if option == 1:                                             # Go forward one page
             self.change_current_page(1)
         elif option == 2:                                           # Go back one page
             self.change_current_page(-1)
         elif option == 3:                                           # Add new page to calendar
-            self.add_page()
+            operation = self.add_page()
         elif option == 4:                                           # Delete the current page
-            self.delete_current_page()
+            operation = self.delete_current_page()
         elif option == 5:                                           # Show all calendar pages
             self.display_all_pages()
         elif option == 6:                                           # Add activity to current page
-            self.pages[self.current_page_index].add_activity()
+            operation = self.pages[self.current_page_index].add_activity()
         elif option == 7:                                           # Remove activity from current page
-            self.pages[self.current_page_index].remove_activity()
+            operation = self.pages[self.current_page_index].remove_activity()
         elif option == 8:                                           # Change activity on current page
-            self.pages[self.current_page_index].change_activity()
+            operation = self.pages[self.current_page_index].change_activity()
         elif option == 9:                                           # Show all activities this month
             self.display_activities_this_month()
-        elif option == 10:                                          # Save date and quit the program
+        elif option == 10:                                          # Undo the latest change
+            self.undo()
+        elif option == 11:                                          # Redo the latest undone change
+            self.redo()
+        elif option == 12:                                          # Save date and quit the program
             self.save_pages()
             quit()
 
+        if operation is not None:
+            self.history.record(operation)
+
+
+def apply_operation(calendar, operation):
+    """
+    Applies an operation record to the calendar. Used when redoing a change.
+    :param calendar: calendar object -- the calendar to change
+    :param operation: tuple -- the operation record
+    :return: (nothing)
+    """
+    kind = operation[0]
+    if kind == "group":
+        for sub_operation in operation[1]:
+            apply_operation(calendar, sub_operation)
+    elif kind == "add_page":
+        page = operation[1]
+        calendar.pages.append(page)
+        calendar.pages.sort()
+        calendar.show_page(page)
+    elif kind == "delete_page":
+        page = operation[1]
+        calendar.pages.remove(page)
+        calendar.show_page(page)
+    elif kind == "add_activity":
+        (page, activity) = operation[1:]
+        page.activities.append(activity)
+        page.activities.sort()
+        calendar.show_page(page)
+    elif kind == "remove_activity":
+        (page, activity) = operation[1:]
+        page.activities.remove(activity)
+        calendar.show_page(page)
+    elif kind == "change_activity":
+        (page, activity, attribute, old_value, new_value) = operation[1:]
+        # Use the same setters as when the activity was first changed
+        setters = {"start_time": activity.change_start_time,
+                   "end_time": activity.change_end_time,
+                   "event": activity.change_event}
+        setters[attribute](new_value)
+        page.activities.sort()
+        calendar.show_page(page)
+
+
+def revert_operation(calendar, operation):
+    """
+    Reverts an operation record in the calendar. Used when undoing a change.
+    :param calendar: calendar object -- the calendar to change
+    :param operation: tuple -- the operation record
+    :return: (nothing)
+    """
+    kind = operation[0]
+    if kind == "group":
+        # Revert in reverse order, latest operation first
+        for sub_operation in reversed(operation[1]):
+            revert_operation(calendar, sub_operation)
+    elif kind == "add_page":
+        apply_operation(calendar, ("delete_page", operation[1]))
+    elif kind == "delete_page":
+        apply_operation(calendar, ("add_page", operation[1]))
+    elif kind == "add_activity":
+        apply_operation(calendar, ("remove_activity",) + operation[1:])
+    elif kind == "remove_activity":
+        apply_operation(calendar, ("add_activity",) + operation[1:])
+    elif kind == "change_activity":
+        (page, activity, attribute, old_value, new_value) = operation[1:]
+        apply_operation(calendar, ("change_activity", page, activity, attribute, new_value, old_value))
+
 
 def get_yes_no_input(prompt_string):
     """"
@@ -637,15 +891,19 @@ def main():
 
     menu_options = ["1. Bläddra framåt", "2. Bläddra bakåt", "3. Sätt in ny sida",
                     "4. Ta bort sidan", "5. Visa alla sidor", "6. Lägg till aktivitet",
-                    "7. Ta bort aktivitet", "8. Ändra aktivitet", "9. Visa månadens aktiviteter", "10. Avsluta"]
+                    "7. Ta bort aktivitet", "8. Ändra aktivitet", "9. Visa månadens aktiviteter", "10. Ångra",
+                    "11. Gör om", "12. Spara och avsluta"]
 
     # Program loop until user quits
     while True:
         if not calendar.pages:
             calendar.add_page()
+            calendar.history.mark_unrecorded_change()
         # Display current page
         print("----Aktuell sida----")
         print(calendar.pages[calendar.current_page_index])
+        if calendar.history.has_unsaved_changes():
+            print("(Osparade ändringar)")
         # Display menu
         menu(menu_options)
         # Get user input
@@ -0,0 +1,319 @@
+"""
+Tests for the undo/redo history in python_calendar.py
+"""
+
+import datetime
+import unittest
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from python_calendar import Activity, Page, Calendar, History
+
+
+def make_calendar(history_depth=50):
+    """
+    Creates a calendar with two pages, where the first page has two activities
+    :param history_depth: int -- the maximum number of changes that can be undone
+    :return: calendar object
+    """
+    first_page = Page(datetime.date(2022, 4, 10), [Activity("10:00", "11:00", "Bokklubb"),
+                                                   Activity("12:00", "13:00", "Lunch")])
+    second_page = Page(datetime.date(2022, 4, 12))
+    return Calendar(1, [first_page, second_page], history_depth=history_depth)
+
+
+class TestUndoRedo(unittest.TestCase):
+    def setUp(self):
+        self.calendar = make_calendar()
+        self.first_page = self.calendar.pages[0]
+        self.second_page = self.calendar.pages[1]
+
+    def test_add_page(self):
+        page = Page(datetime.date(2022, 4, 11))
+        self.calendar.pages.insert(1, page)
+        self.calendar.history.record(("add_page", page))
+
+        self.assertTrue(self.calendar.history.undo(self.calendar))
+        self.assertEqual(self.calendar.pages, [self.first_page, self.second_page])
+        self.assertTrue(self.calendar.history.redo(self.calendar))
+        self.assertEqual(self.calendar.pages, [self.first_page, page, self.second_page])
+        self.assertEqual(self.calendar.current_page_index, 1)
+
+    def test_delete_page(self):
+        self.calendar.current_page_index = 1
+        self.calendar.history.record(self.calendar.delete_current_page())
+        self.assertEqual(self.calendar.pages, [self.first_page])
+        self.assertEqual(self.calendar.current_page_index, 0)
+
+        self.calendar.history.undo(self.calendar)
+        self.assertEqual(self.calendar.pages, [self.first_page, self.second_page])
+        self.assertEqual(self.calendar.current_page_index, 1)
+        self.calendar.history.redo(self.calendar)
+        self.assertEqual(self.calendar.pages, [self.first_page])
+        self.assertEqual(self.calendar.current_page_index, 0)
+
+    def test_delete_last_page_is_grouped(self):
+        calendar = Calendar(1, [self.first_page])
+        # Deleting the last page lets the user add a replacement page with one activity
+        with patch("python_calendar.get_date_input", return_value=datetime.date(2022, 5, 1)), \
+                patch("builtins.input", side_effect=["0900", "1000", "Möte"]):
+            calendar.execute_option(4)
+        self.assertEqual(len(calendar.pages), 1)
+        replacement_page = calendar.pages[0]
+        self.assertEqual(replacement_page.date, datetime.date(2022, 5, 1))
+        self.assertEqual(str(replacement_page.activities[0]), "09:00-10:00: Möte")
+
+        # One undo restores the deleted page and removes the replacement page
+        calendar.history.undo(calendar)
+        self.assertEqual(calendar.pages, [self.first_page])
+        self.assertEqual(calendar.current_page_index, 0)
+        self.assertFalse(calendar.history.undo(calendar))
+        calendar.history.redo(calendar)
+        self.assertEqual(calendar.pages, [replacement_page])
+
+    def test_add_activity(self):
+        activity = Activity("08:00", "09:00", "Frukost")
+        self.first_page.activities.insert(0, activity)
+        self.calendar.history.record(("add_activity", self.first_page, activity))
+
+        self.calendar.history.undo(self.calendar)
+        self.assertNotIn(activity, self.first_page.activities)
+        self.calendar.history.redo(self.calendar)
+        self.assertIs(self.first_page.activities[0], activity)
+
+    def test_remove_activity(self):
+        activity = self.first_page.activities.pop(0)
+        self.calendar.history.record(("remove_activity", self.first_page, activity))
+
+        self.calendar.history.undo(self.calendar)
+        self.assertIs(self.first_page.activities[0], activity)
+        self.calendar.history.redo(self.calendar)
+        self.assertNotIn(activity, self.first_page.activities)
+
+    def test_change_activity(self):
+        activity = self.first_page.activities[0]
+        activity.change_start_time("12:30")
+        self.first_page.activities.sort()
+        self.calendar.history.record(("change_activity", self.first_page, activity, "start_time", "10:00", "12:30"))
+
+        self.calendar.history.undo(self.calendar)
+        self.assertEqual(activity.start_time, "10:00")
+        self.assertIs(self.first_page.activities[0], activity)
+        self.calendar.history.redo(self.calendar)
+        self.assertEqual(activity.start_time, "12:30")
+        self.assertIs(self.first_page.activities[1], activity)
+
+    def test_undo_shows_changed_page(self):
+        activity = Activity("10:00", "11:00", "Möte")
+        self.second_page.activities.append(activity)
+        self.calendar.history.record(("add_activity", self.second_page, activity))
+        self.calendar.current_page_index = 0
+
+        self.calendar.history.undo(self.calendar)
+        self.assertEqual(self.calendar.current_page_index, 1)
+
+    def test_record_clears_redo(self):
+        activity = self.first_page.activities.pop()
+        self.calendar.history.record(("remove_activity", self.first_page, activity))
+        self.calendar.history.undo(self.calendar)
+        self.calendar.history.record(("change_activity", self.first_page, activity, "event", "Lunch", "Middag"))
+        self.assertFalse(self.calendar.history.redo(self.calendar))
+
+    def test_nothing_to_undo_or_redo(self):
+        self.assertFalse(self.calendar.history.undo(self.calendar))
+        self.assertFalse(self.calendar.history.redo(self.calendar))
+
+
+class TestRecordedEdits(unittest.TestCase):
+    """
+    Makes edits through the menu options, so the operation records are built by the calendar itself
+    """
+    def setUp(self):
+        self.calendar = make_calendar()
+        self.page = self.calendar.pages[0]
+        self.activities_before = list(self.page.activities)
+
+    def execute_option(self, option, inputs):
+        """
+        Executes a menu option with the given user input
+        :param option: int -- the menu option
+        :param inputs: list of strings -- the user input, in order
+        :return: (nothing)
+        """
+        with patch("builtins.input", side_effect=inputs):
+            self.calendar.execute_option(option)
+
+    def assert_undo_redo(self):
+        """
+        Checks that undo restores the activities from before the edit and that redo restores them after the edit
+        :return: (nothing)
+        """
+        activities_after = [str(activity) for activity in self.page.activities]
+        self.assertTrue(self.calendar.history.undo(self.calendar))
+        self.assertEqual(self.page.activities, self.activities_before)
+        self.assertEqual([str(activity) for activity in self.page.activities],
+                         ["10:00-11:00: Bokklubb", "12:00-13:00: Lunch"])
+        self.assertTrue(self.calendar.history.redo(self.calendar))
+        self.assertEqual([str(activity) for activity in self.page.activities], activities_after)
+
+    def test_add_activity(self):
+        self.execute_option(6, ["0800", "0900", "Frukost"])
+        self.assertEqual(str(self.page.activities[0]), "08:00-09:00: Frukost")
+        self.assert_undo_redo()
+
+    def test_remove_activity(self):
+        self.execute_option(7, ["2"])
+        self.assertEqual(self.page.activities, self.activities_before[:1])
+        self.assert_undo_redo()
+
+    def test_change_start_time(self):
+        self.execute_option(8, ["2", "1", "1130"])
+        self.assertEqual(str(self.page.activities[0]), "10:00-11:00: Bokklubb")
+        self.assertEqual(str(self.page.activities[1]), "11:30-13:00: Lunch")
+        self.assert_undo_redo()
+
+    def test_change_start_time_reorders_activities(self):
+        # 09:30-13:00 overlaps the other activity, the user changes the time anyway
+        self.execute_option(8, ["2", "1", "0930", "j"])
+        self.assertEqual(str(self.page.activities[0]), "09:30-13:00: Lunch")
+        self.assert_undo_redo()
+
+    def test_change_end_time(self):
+        self.execute_option(8, ["1", "2", "1130"])
+        self.assertEqual(str(self.page.activities[0]), "10:00-11:30: Bokklubb")
+        self.assert_undo_redo()
+
+    def test_change_event(self):
+        self.execute_option(8, ["2", "3", "Middag"])
+        self.assertEqual(str(self.page.activities[1]), "12:00-13:00: Middag")
+        self.assert_undo_redo()
+
+    def test_remove_activity_without_activities(self):
+        empty_page = self.calendar.pages[1]
+        self.assertIsNone(empty_page.remove_activity())
+        self.calendar.current_page_index = 1
+        self.execute_option(7, [])
+        self.assertFalse(self.calendar.history.undo(self.calendar))
+        self.assertFalse(self.calendar.history.has_unsaved_changes())
+
+
+class TestChangeTimes(unittest.TestCase):
+    def setUp(self):
+        self.first_activity = Activity("10:00", "11:00", "Bokklubb")
+        self.second_activity = Activity("12:00", "13:00", "Lunch")
+        self.page = Page(datetime.date(2022, 4, 10), [self.first_activity, self.second_activity])
+
+    def test_overlapping_times_ignores_activity(self):
+        self.assertTrue(self.page.overlapping_times("10:30", "11:00"))
+        self.assertFalse(self.page.overlapping_times("10:30", "11:00", self.first_activity))
+        self.assertTrue(self.page.overlapping_times("10:30", "12:30", self.first_activity))
+
+    def test_start_time_after_end_time_is_rejected(self):
+        # 11:30 is after the end time, the user is asked again and enters 09:00
+        input_mock = patch("builtins.input", side_effect=["1130", "0900"])
+        with input_mock as mocked_input:
+            operation = self.page.execute_activity_option(1, self.first_activity)
+        self.assertEqual(mocked_input.call_count, 2)
+        self.assertEqual(operation, ("change_activity", self.page, self.first_activity, "start_time",
+                                     "10:00", "09:00"))
+        self.assertEqual(self.first_activity.start_time, "09:00")
+
+    def test_end_time_before_start_time_is_rejected(self):
+        input_mock = patch("builtins.input", side_effect=["0930", "1130"])
+        with input_mock as mocked_input:
+            self.page.execute_activity_option(2, self.first_activity)
+        self.assertEqual(mocked_input.call_count, 2)
+        self.assertEqual(self.first_activity.end_time, "11:30")
+
+
+class TestHistoryDepth(unittest.TestCase):
+    def record_changes(self, calendar, number_of_changes):
+        """
+        Changes the event of the first activity and records each change
+        :param calendar: calendar object -- the calendar to change
+        :param number_of_changes: int -- the number of changes to make
+        :return: (nothing)
+        """
+        page = calendar.pages[0]
+        activity = page.activities[0]
+        for i in range(number_of_changes):
+            old_event = activity.event
+            activity.change_event("Händelse " + str(i))
+            calendar.history.record(("change_activity", page, activity, "event", old_event, activity.event))
+
+    def test_depth_limit(self):
+        calendar = make_calendar(history_depth=2)
+        self.record_changes(calendar, 3)
+        self.assertTrue(calendar.history.undo(calendar))
+        self.assertTrue(calendar.history.undo(calendar))
+        self.assertFalse(calendar.history.undo(calendar))
+        # The oldest change was dropped, so it is still applied
+        self.assertEqual(calendar.pages[0].activities[0].event, "Händelse 0")
+
+    def test_unsaved_after_eviction(self):
+        calendar = make_calendar(history_depth=2)
+        self.record_changes(calendar, 3)
+        while calendar.history.undo(calendar):
+            pass
+        self.assertTrue(calendar.history.has_unsaved_changes())
+
+    def test_saved_after_eviction(self):
+        calendar = make_calendar(history_depth=2)
+        self.record_changes(calendar, 3)
+        calendar.history.undo(calendar)
+        calendar.history.undo(calendar)
+        calendar.history.mark_saved()
+        self.assertFalse(calendar.history.has_unsaved_changes())
+        calendar.history.redo(calendar)
+        self.assertTrue(calendar.history.has_unsaved_changes())
+        calendar.history.undo(calendar)
+        self.assertFalse(calendar.history.has_unsaved_changes())
+
+    def test_depth_zero(self):
+        calendar = make_calendar(history_depth=0)
+        self.assertFalse(calendar.history.has_unsaved_changes())
+        self.record_changes(calendar, 1)
+        self.assertFalse(calendar.history.undo(calendar))
+        self.assertTrue(calendar.history.has_unsaved_changes())
+        calendar.history.mark_saved()
+        self.assertFalse(calendar.history.has_unsaved_changes())
+
+
+class TestSavedState(unittest.TestCase):
+    def test_save_undo_redo(self):
+        calendar = make_calendar()
+        page = calendar.pages[0]
+        activity = page.activities.pop()
+        calendar.history.record(("remove_activity", page, activity))
+        self.assertTrue(calendar.history.has_unsaved_changes())
+
+        with TemporaryDirectory() as folder_path:
+            calendar.data_file_path = join(folder_path, "pages.txt")
+            calendar.save_pages()
+        self.assertFalse(calendar.history.has_unsaved_changes())
+
+        calendar.history.undo(calendar)
+        self.assertTrue(calendar.history.has_unsaved_changes())
+        calendar.history.redo(calendar)
+        self.assertFalse(calendar.history.has_unsaved_changes())
+
+    def test_first_page_without_data_is_unsaved(self):
+        with TemporaryDirectory() as folder_path:
+            calendar = Calendar(1, [], data_file_path=join(folder_path, "pages.txt"))
+            with patch("python_calendar.get_date_input", return_value=datetime.date(2022, 5, 1)), \
+                    patch("builtins.input", side_effect=["0900", "1000", "Möte"]):
+                calendar.load_pages()
+            self.assertEqual(len(calendar.pages), 1)
+            self.assertTrue(calendar.history.has_unsaved_changes())
+            # The first page is not an undoable change
+            self.assertFalse(calendar.history.undo(calendar))
+            calendar.save_pages()
+        self.assertFalse(calendar.history.has_unsaved_changes())
+
+    def test_new_history_has_no_unsaved_changes(self):
+        self.assertFalse(History().has_unsaved_changes())
+
+
+if __name__ == '__main__':
+    unittest.main()